@@ -3,6 +3,8 @@ Módulo de autenticación por API Key.
 SAP debe enviar el header X-API-Key en cada request protegido.
 """
 
+import hmac
+
 from fastapi import Security, HTTPException, status
 from fastapi.security import APIKeyHeader
 from .config import get_settings
@@ -10,6 +12,10 @@ from .config import get_settings
 # Definir el esquema de seguridad — SAP envía la key en este header
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
+# La key es constante por proceso: se resuelve una sola vez al importar en
+# lugar de llamar get_settings() en cada request.
+_API_KEY_BYTES = get_settings().API_KEY.encode()
+
 
 async def verify_api_key(
     api_key: str = Security(api_key_header),
@@ -21,6 +27,12 @@ async def verify_api_key(
         @app.get("/ruta", dependencies=[Depends(verify_api_key)])
 
     Retorna la API key si es válida, lanza 401 si no.
+
+    Async a propósito: una dependency `def` iría al threadpool, que está
+    limitado al tamaño del pool de conexiones — no vale la pena gastar un
+    thread en una comparación en memoria. La comparación usa
+    hmac.compare_digest para que el tiempo no dependa de cuántos bytes
+    coinciden (sin timing leak).
     """
     if api_key is None:
         raise HTTPException(
@@ -28,8 +40,7 @@ async def verify_api_key(
             detail="API Key requerida. Envía el header X-API-Key.",
         )
 
-    settings = get_settings()
-    if api_key != settings.API_KEY:
+    if not hmac.compare_digest(api_key.encode(), _API_KEY_BYTES):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="API Key inválida.",
@@ -2,12 +2,20 @@
 Módulo de conexión a Azure SQL Database usando pyodbc con pool de conexiones.
 
 El pool evita abrir una conexión nueva en cada request (costoso en tiempo y
-recursos de Azure SQL). Las conexiones se reutilizan y se validan antes de
-devolverse al caller.
+recursos de Azure SQL). Las conexiones se reutilizan en orden LIFO (la más
+reciente primero, que es la que tiene menos probabilidad de haber expirado)
+y NO se validan al sacarlas del pool: un `SELECT 1` por acquire duplicaba la
+latencia de cada request. Si una conexión resultó estar muerta, el caller lo
+ve como `pyodbc.Error` y reintenta una vez con conexión nueva (ver
+`retry_on_connection_error`). Un thread de fondo cierra las conexiones que
+llevan demasiado tiempo ociosas.
 """
 
+import functools
 import pyodbc
+import queue
 import threading
+import time
 import logging
 from contextlib import contextmanager
 from .config import get_settings
@@ -15,15 +23,55 @@ from .config import get_settings
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
-# Pool de conexiones simple y thread-safe
+# Pool de conexiones thread-safe
 # ---------------------------------------------------------------------------
-_pool: list = []
-_pool_lock = threading.Lock()
 _MAX_POOL_SIZE = 5  # Máximo de conexiones simultáneas
+_IDLE_TIMEOUT = 300.0  # Segundos de inactividad antes de cerrar una conexión
+_IDLE_SWEEP_INTERVAL = 60.0  # Cada cuánto revisa el thread de limpieza
 
+# LifoQueue: ya es thread-safe (no necesita lock propio) y al ser LIFO las
+# conexiones frías quedan al fondo, donde el thread de limpieza las recoge.
+_pool: "queue.LifoQueue[_PooledConnection]" = queue.LifoQueue(maxsize=_MAX_POOL_SIZE)
 
+
+class _PooledConnection:
+    """
+    Envoltura liviana sobre pyodbc.Connection que registra el último uso y
+    mantiene cursores cacheados por sentencia (pyodbc.Connection no admite
+    atributos arbitrarios). Delega todo lo demás a la conexión real, así
+    los callers la usan como siempre.
+    """
+
+    def __init__(self, conn: pyodbc.Connection):
+        self._conn = conn
+        self.last_used = time.monotonic()
+        self._cached_cursors: dict = {}
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cached_cursor(self, key: str) -> pyodbc.Cursor:
+        """
+        Retorna un cursor dedicado a una sentencia conocida, creándolo la
+        primera vez. pyodbc conserva el statement handle en el cursor: si
+        el mismo cursor re-ejecuta el mismo SQL, el driver se salta la fase
+        de PREPARE/describe contra el servidor. Seguro porque la conexión
+        es exclusiva del request mientras está fuera del pool.
+        """
+        cursor = self._cached_cursors.get(key)
+        if cursor is None:
+            cursor = self._cached_cursors[key] = self._conn.cursor()
+        return cursor
+
+
+@functools.lru_cache(maxsize=1)
 def get_connection_string() -> str:
-    """Construye el string de conexión para Azure SQL."""
+    """
+    Construye el string de conexión para Azure SQL.
+
+    Cacheado: los settings son un singleton, así que el string es constante
+    por proceso y no hace falta reformatearlo en cada connect.
+    """
     settings = get_settings()
     return (
         f"DRIVER={{{settings.DB_DRIVER}}};"
@@ -37,47 +85,83 @@ def get_connection_string() -> str:
     )
 
 
-def _is_connection_alive(conn: pyodbc.Connection) -> bool:
-    """Verifica si una conexión del pool sigue activa."""
-    try:
-        conn.cursor().execute("SELECT 1")
-        return True
-    except Exception:
-        return False
+def open_pooled_connection() -> _PooledConnection:
+    """Abre una conexión nueva lista para el pool (usada en el pre-calentado)."""
+    return _PooledConnection(pyodbc.connect(get_connection_string()))
 
 
-def _get_from_pool() -> pyodbc.Connection:
+def close_pool() -> None:
+    """Cierra todas las conexiones del pool (shutdown de la aplicación)."""
+    while True:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            break
+        try:
+            conn.close()
+        except Exception:
+            pass
+    logger.debug("Pool de conexiones cerrado.")
+
+
+def _get_from_pool() -> _PooledConnection:
     """
-    Intenta obtener una conexión reutilizable del pool.
-    Si el pool está vacío o todas las conexiones están muertas, crea una nueva.
+    Obtiene una conexión del pool sin validarla (sin round-trip extra).
+    Si el pool está vacío, crea una nueva.
     """
-    with _pool_lock:
-        while _pool:
-            conn = _pool.pop()
-            if _is_connection_alive(conn):
-                logger.debug("Conexión reutilizada del pool.")
-                return conn
-            else:
-                logger.debug("Conexión muerta descartada del pool.")
-                try:
-                    conn.close()
-                except Exception:
-                    pass
-
-    # No había conexiones válidas → crear una nueva
-    logger.debug("Creando nueva conexión a la base de datos.")
-    return pyodbc.connect(get_connection_string())
-
-
-def _return_to_pool(conn: pyodbc.Connection) -> None:
+    try:
+        conn = _pool.get_nowait()
+        logger.debug("Conexión reutilizada del pool.")
+        return conn
+    except queue.Empty:
+        logger.debug("Pool vacío — creando nueva conexión a la base de datos.")
+        return _PooledConnection(pyodbc.connect(get_connection_string()))
+
+
+def _return_to_pool(conn: _PooledConnection) -> None:
     """Devuelve una conexión al pool si hay espacio; si no, la cierra."""
-    with _pool_lock:
-        if len(_pool) < _MAX_POOL_SIZE:
-            _pool.append(conn)
-            logger.debug("Conexión devuelta al pool.")
+    conn.last_used = time.monotonic()
+    try:
+        _pool.put_nowait(conn)
+        logger.debug("Conexión devuelta al pool.")
+    except queue.Full:
+        conn.close()
+        logger.debug("Pool lleno — conexión cerrada.")
+
+
+def _evict_idle_connections() -> None:
+    """Cierra las conexiones del pool que superaron _IDLE_TIMEOUT sin uso."""
+    ahora = time.monotonic()
+    vigentes = []
+    while True:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            break
+        if ahora - conn.last_used > _IDLE_TIMEOUT:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            logger.debug("Conexión ociosa cerrada por el thread de limpieza.")
         else:
+            vigentes.append(conn)
+
+    for conn in vigentes:
+        try:
+            _pool.put_nowait(conn)
+        except queue.Full:
             conn.close()
-            logger.debug("Pool lleno — conexión cerrada.")
+
+
+def _idle_sweep_loop() -> None:
+    while True:
+        time.sleep(_IDLE_SWEEP_INTERVAL)
+        _evict_idle_connections()
+
+
+# Thread daemon: muere con el proceso, no bloquea el shutdown.
+threading.Thread(target=_idle_sweep_loop, name="db-pool-sweeper", daemon=True).start()
 
 
 # ---------------------------------------------------------------------------
@@ -108,6 +192,26 @@ def get_db_connection():
         _return_to_pool(conn)
 
 
+def retry_on_connection_error(fn):
+    """
+    Reintenta `fn` una vez si falla con pyodbc.Error.
+
+    Como el pool ya no valida las conexiones al sacarlas, una conexión que
+    Azure SQL cerró del otro lado se descubre recién al ejecutar la query.
+    `get_db_connection` descarta la conexión fallida, así que el reintento
+    corre sobre una conexión distinta (o recién creada).
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except pyodbc.Error:
+            logger.warning("pyodbc.Error en %s — reintentando con otra conexión.", fn.__name__)
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
 def test_connection() -> bool:
     """Prueba la conexión a la base de datos. Retorna True si es exitosa."""
     try:
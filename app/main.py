@@ -10,30 +10,119 @@ Endpoints:
 NOTA: /formato-sap debe estar ANTES de /{instrumento} para evitar conflicto de rutas.
 """
 
-from fastapi import FastAPI, Depends, HTTPException, Query, status, Response
-from fastapi.responses import PlainTextResponse
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from weakref import WeakKeyDictionary
+
+import anyio.to_thread
+import orjson
+import pyodbc
+
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import APIRoute
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional
-from datetime import datetime
 
 from .config import get_settings
-from .database import get_db_connection, test_connection
-from .models import MonedaValor, MonedaValorListResponse, HealthResponse, ErrorResponse, TasaCambioSAP
+from .database import (
+    close_pool,
+    get_db_connection,
+    open_pooled_connection,
+    retry_on_connection_error,
+    test_connection,
+    _MAX_POOL_SIZE,
+    _return_to_pool,
+)
+from .models import MonedaValor, MonedaValorListResponse, HealthResponse, ErrorResponse
 # from .auth import verify_api_key  # Deshabilitado para pruebas con SAP
 
+logger = logging.getLogger(__name__)
+
+
+class CachedAPIRoute(APIRoute):
+    """
+    APIRoute que memoiza el handler ASGI por función de endpoint.
+
+    Cada vez que FastAPI materializa el handler de una ruta repite la
+    introspección del callable (inspect.signature, iscoroutinefunction,
+    armado del dependant). Los endpoints de esta API se definen una sola
+    vez y nunca cambian, así que el resultado se cachea en un
+    WeakKeyDictionary keyed por el endpoint.
+    """
+
+    _handler_cache: WeakKeyDictionary = WeakKeyDictionary()
+
+    def get_route_handler(self):
+        handler = CachedAPIRoute._handler_cache.get(self.endpoint)
+        if handler is None:
+            handler = super().get_route_handler()
+            CachedAPIRoute._handler_cache[self.endpoint] = handler
+        return handler
+
+
 # ---------------------------------------------------------------------------
 # App
 # ---------------------------------------------------------------------------
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup/shutdown de la aplicación.
+
+    - Limita el threadpool por defecto de Starlette al tamaño del pool de
+      conexiones: no tiene sentido tener más threads esperando la base de
+      datos que conexiones disponibles en el pool.
+    - Pre-calienta el pool abriendo las _MAX_POOL_SIZE conexiones en
+      paralelo: el handshake DNS+TCP+TLS+login contra Azure SQL ronda el
+      segundo, y sin esto los primeros N requests lo pagan completo.
+    """
+    anyio.to_thread.current_default_thread_limiter().total_tokens = _MAX_POOL_SIZE
+
+    # El pool es por proceso: con varios workers de Gunicorn el total de
+    # sesiones contra Azure SQL es workers × pool_size. Se loguea por PID
+    # para poder auditarlo.
+    logger.info("Worker %d iniciado — pool de hasta %d conexiones.", os.getpid(), _MAX_POOL_SIZE)
+
+    try:
+        conns = await asyncio.gather(
+            *[asyncio.to_thread(open_pooled_connection) for _ in range(_MAX_POOL_SIZE)]
+        )
+    except Exception:
+        # La base puede no estar disponible todavía; los requests crearán
+        # conexiones on-demand como siempre.
+        logger.warning("No se pudo pre-calentar el pool de conexiones.", exc_info=True)
+    else:
+        for conn in conns:
+            _return_to_pool(conn)
+        logger.info("Pool de conexiones pre-calentado (%d conexiones).", _MAX_POOL_SIZE)
+
+    yield
+
+    close_pool()
+
 app = FastAPI(
     title=settings.APP_TITLE,
     version=settings.APP_VERSION,
     description="API REST para exponer la tabla dbo.MonedaValor de Azure SQL. Diseñada para ser consumida por SAP.",
     docs_url="/docs",
     redoc_url="/redoc",
+    # orjson serializa dicts/strings varias veces más rápido que el json de
+    # la librería estándar — importa en el endpoint de listado.
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
+# Debe asignarse antes de registrar los endpoints para que aplique a todos.
+app.router.route_class = CachedAPIRoute
+
 # CORS — permitir acceso desde SAP y otros orígenes
 app.add_middleware(
     CORSMiddleware,
@@ -44,6 +133,99 @@ app.add_middleware(
 )
 
 
+# ---------------------------------------------------------------------------
+# Helpers síncronos de acceso a datos
+#
+# pyodbc es bloqueante: ejecutarlo dentro de un `async def` congela el event
+# loop y serializa todos los requests concurrentes. Estos helpers concentran
+# el trabajo de base de datos y los endpoints los ejecutan en el threadpool
+# con `run_in_threadpool(...)`, liberando el loop durante el I/O de red.
+#
+# El TRIM va en la proyección SQL (SQL Server 2017+): recorta en el servidor
+# con un operador set-based en vez de N×4 .strip() en Python, y las columnas
+# CHAR viajan sin su padding por el wire.
+# ---------------------------------------------------------------------------
+_COLS = (
+    "TRIM(SSINSTRUMNT) AS SSINSTRUMNT, TRIM(MIFEEDNAME) AS MIFEEDNAME, "
+    "TRIM(RATETYPE) AS RATETYPE, TIMESTAMP_VALOR, TRIM(CURRENCY) AS CURRENCY"
+)
+# Una sola sentencia para el listado con y sin filtro: con el parámetro
+# nullable el plan cache de SQL Server guarda un único plan (y el cursor
+# cacheado un único statement handle) en vez de dos textos distintos.
+_SQL_LIST = f"SELECT {_COLS} FROM dbo.MonedaValor WHERE (? IS NULL OR SSINSTRUMNT = ?)"
+_SQL_BY_INSTRUMENTO = f"SELECT {_COLS} FROM dbo.MonedaValor WHERE SSINSTRUMNT = ?"
+_SQL_TASA_SAP = f"SELECT TOP 1 {_COLS} FROM dbo.MonedaValor ORDER BY TIMESTAMP_VALOR DESC"
+@retry_on_connection_error
+def _fetch_moneda_valor(ssinstrumnt: Optional[str]) -> list[dict]:
+    """Consulta dbo.MonedaValor (con filtro opcional) y retorna dicts listos para serializar."""
+    with get_db_connection() as conn:
+        # Cursor dedicado por sentencia: re-ejecutar el mismo SQL sobre el
+        # mismo cursor reutiliza el statement handle ya preparado.
+        cursor = conn.cached_cursor("list")
+        # Declarar el tipo de los parámetros evita que el driver haga un
+        # round-trip extra para deducirlo (type probing).
+        cursor.setinputsizes([(pyodbc.SQL_WVARCHAR, 20, 0), (pyodbc.SQL_WVARCHAR, 20, 0)])
+        # Traer filas en lotes grandes del driver en vez del default (1)
+        cursor.arraysize = 500
+
+        filtro = ssinstrumnt.strip() if ssinstrumnt else None
+        cursor.execute(_SQL_LIST, (filtro, filtro))
+
+        # Iterar el cursor directamente: evita materializar la lista
+        # intermedia de fetchall(). Se construyen dicts planos (en vez de
+        # modelos Pydantic) para que orjson los serialice sin el round-trip
+        # de model_dump(). El desempaquetado posicional evita el __getattr__
+        # de pyodbc.Row por cada columna.
+        return [
+            {
+                "ssinstrumnt": ssi,
+                "mifeedname": mfn,
+                "ratetype": rt,
+                "timestamp_valor": tv,
+                "currency": cur,
+            }
+            for ssi, mfn, rt, tv, cur in cursor
+        ]
+
+
+@retry_on_connection_error
+def _fetch_instrumento(instrumento: str) -> Optional[MonedaValor]:
+    """Consulta una fila por SSINSTRUMNT. Retorna None si no existe."""
+    with get_db_connection() as conn:
+        cursor = conn.cached_cursor("by_instrumento")
+        cursor.execute(_SQL_BY_INSTRUMENTO, (instrumento.strip(),))
+        row = cursor.fetchone()
+
+        if row is None:
+            return None
+
+        ssi, mfn, rt, tv, cur = row
+        return MonedaValor.model_construct(
+            ssinstrumnt=ssi,
+            mifeedname=mfn,
+            ratetype=rt,
+            timestamp_valor=tv,
+            currency=cur,
+        )
+
+
+@retry_on_connection_error
+def _fetch_tasa_sap():
+    """
+    Consulta la fila más reciente para el formato SAP. Retorna None si la
+    tabla está vacía.
+
+    TOP 1 permite que el optimizador se detenga en la primera fila en vez de
+    ordenar la tabla completa. Para que además use un index seek, conviene:
+        CREATE INDEX IX_MonedaValor_TS ON dbo.MonedaValor(TIMESTAMP_VALOR DESC)
+            INCLUDE (SSINSTRUMNT, MIFEEDNAME, RATETYPE, CURRENCY)
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cached_cursor("tasa_sap")
+        cursor.execute(_SQL_TASA_SAP)
+        return cursor.fetchone()
+
+
 # ---------------------------------------------------------------------------
 # Root Endpoint
 # ---------------------------------------------------------------------------
@@ -71,7 +253,17 @@ async def root():
 
 # ---------------------------------------------------------------------------
 # Health Check (sin autenticación)
+#
+# El resultado se cachea unos segundos: los probes de liveness/readiness
+# llegan en ráfagas y sin cache cada uno acapara una conexión del pool solo
+# para ejecutar SELECT 1. Con el cache, N probes concurrentes cuestan un
+# solo round-trip a la base de datos por ventana de _HEALTH_TTL segundos.
 # ---------------------------------------------------------------------------
+_HEALTH_TTL = 5.0  # segundos
+_health_cache: tuple[float, bool] = (0.0, False)  # (timestamp monotónico, db_ok)
+_health_lock = asyncio.Lock()
+
+
 @app.get(
     "/health",
     response_model=HealthResponse,
@@ -79,8 +271,19 @@ async def root():
     summary="Verificar estado de la API y la base de datos",
 )
 async def health_check():
-    """Retorna el estado de la API y la conexión a la base de datos."""
-    db_ok = test_connection()
+    """Retorna el estado de la API y la conexión a la base de datos (cacheado)."""
+    global _health_cache
+
+    ts, db_ok = _health_cache
+    if time.monotonic() - ts >= _HEALTH_TTL:
+        async with _health_lock:
+            # Revalidar dentro del lock: otro request pudo refrescar el cache
+            # mientras esperábamos.
+            ts, db_ok = _health_cache
+            if time.monotonic() - ts >= _HEALTH_TTL:
+                db_ok = await run_in_threadpool(test_connection)
+                _health_cache = (time.monotonic(), db_ok)
+
     return HealthResponse(
         status="healthy",
         database="connected" if db_ok else "disconnected",
@@ -90,14 +293,20 @@ async def health_check():
 # ---------------------------------------------------------------------------
 # GET /api/moneda-valor  —  Listar monedas
 # ---------------------------------------------------------------------------
+# Sin response_model: revalidaría la salida fila por fila. El esquema queda
+# documentado en `responses` para OpenAPI.
 @app.get(
     "/api/moneda-valor",
-    response_model=MonedaValorListResponse,
     tags=["MonedaValor"],
     summary="Listar todas las monedas",
-    responses={401: {"model": ErrorResponse}},
+    responses={
+        200: {"model": MonedaValorListResponse},
+        304: {"description": "Sin cambios desde el ETag enviado en If-None-Match"},
+        401: {"model": ErrorResponse},
+    },
 )
 async def list_moneda_valor(
+    request: Request,
     ssinstrumnt: Optional[str] = Query(
         None,
         description="Filtrar por instrumento (ej: USDCOPTRM)",
@@ -108,33 +317,18 @@ async def list_moneda_valor(
     Retorna todas las filas de la tabla dbo.MonedaValor (nueva estructura).
 
     - Si se envía el parámetro `ssinstrumnt`, filtra por ese instrumento.
+    - Soporta `If-None-Match`: si el contenido no cambió responde 304 sin
+      cuerpo, ahorrando serialización y bytes en el wire para los polls.
     """
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
+        data = await run_in_threadpool(_fetch_moneda_valor, ssinstrumnt)
+        body = orjson.dumps({"count": len(data), "data": data})
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
 
-            if ssinstrumnt:
-                cursor.execute(
-                    "SELECT SSINSTRUMNT, MIFEEDNAME, RATETYPE, TIMESTAMP_VALOR, CURRENCY FROM dbo.MonedaValor WHERE SSINSTRUMNT = ?",
-                    (ssinstrumnt.strip(),),
-                )
-            else:
-                cursor.execute("SELECT SSINSTRUMNT, MIFEEDNAME, RATETYPE, TIMESTAMP_VALOR, CURRENCY FROM dbo.MonedaValor")
-
-            rows = cursor.fetchall()
-
-            data = [
-                MonedaValor(
-                    ssinstrumnt=row.SSINSTRUMNT.strip(),
-                    mifeedname=row.MIFEEDNAME.strip(),
-                    ratetype=row.RATETYPE.strip(),
-                    timestamp_valor=row.TIMESTAMP_VALOR,
-                    currency=row.CURRENCY.strip(),
-                )
-                for row in rows
-            ]
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
 
-            return MonedaValorListResponse(count=len(data), data=data)
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
     except Exception as e:
         raise HTTPException(
@@ -147,7 +341,42 @@ async def list_moneda_valor(
 # GET /api/moneda-valor/formato-sap  —  Formato fixed-width para TBD4
 # IMPORTANTE: debe estar ANTES de /{instrumento} para que FastAPI no lo
 # capture como si fuera un instrumento llamado "formato-sap".
+#
+# Los campos que SAP espera vacíos (SSTATS, ERROR, RSUPID, RCONID, RCONCN,
+# MKIND, CFFACT, CTFACT, UNAME, RZUSATZ) son constantes, así que van
+# horneados en la plantilla en vez de recalcularse en cada request.
 # ---------------------------------------------------------------------------
+_SAP_RELLENO_MEDIO = " " * 107  # SSTATS(2) + ERROR(80) + RSUPID(10) + RCONID(10) + RCONCN(5)
+_SAP_RELLENO_FINAL = " " * 41   # MKIND(5) + CFFACT(7) + CTFACT(7) + UNAME(12) + RZUSATZ(10)
+
+_SAP_LINEA_TMPL = (
+    "{rinid1}{rinid2}{sprpty}"
+    + _SAP_RELLENO_MEDIO
+    + "{fecha}{hora}{valor}{currency}"
+    + _SAP_RELLENO_FINAL
+)
+
+# Cache con TTL corto, mismo patrón que el health check: la tasa cambia a lo
+# sumo unas veces al día (TRM) pero SAP la pollea constantemente; dentro de
+# la ventana los polls repetidos no tocan la base de datos.
+#
+# Se cachean los bytes ya codificados: la línea es ASCII puro, así que
+# codificarla una vez y responder con Content-Length fijo evita el encode y
+# la detección de charset de Starlette en cada poll.
+_SAP_CACHE_TTL = 60.0  # segundos
+# (timestamp monotónico, línea codificada, headers con Content-Length y ETag)
+_sap_cache: tuple[float, bytes, dict] = (0.0, b"", {})
+_sap_lock = asyncio.Lock()
+_SAP_MEDIA_TYPE = "text/plain; charset=us-ascii"
+
+
+def _sap_response(request: Request, body: bytes, headers: dict) -> Response:
+    """Respuesta para /formato-sap honrando If-None-Match (304 sin cuerpo)."""
+    if request.headers.get("if-none-match") == headers.get("ETag"):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": headers["ETag"]})
+    return Response(content=body, media_type=_SAP_MEDIA_TYPE, headers=headers)
+
+
 @app.get(
     "/api/moneda-valor/formato-sap",
     tags=["MonedaValor"],
@@ -155,15 +384,16 @@ async def list_moneda_valor(
     description="Retorna una línea de texto plano de 237 caracteres formateada para el datafeed de SAP.",
     responses={
         200: {"content": {"text/plain": {}}, "description": "Línea de 237 caracteres"},
+        304: {"description": "Sin cambios desde el ETag enviado en If-None-Match"},
         401: {"model": ErrorResponse},
         404: {"model": ErrorResponse}
     },
 )
-async def get_tasa_cambio_sap():
+async def get_tasa_cambio_sap(request: Request):
     """
     Retorna la tasa de cambio en formato fixed-width (238 caracteres) compatible con TBD4/RINID de SAP.
-    
-    Lee de la tabla MonedaValor (nueva estructura) y genera el formato SAP.
+
+    Lee la fila más reciente de la tabla MonedaValor (por TIMESTAMP_VALOR) y genera el formato SAP.
     
     Formato:
     - Pos 1-20: RINID1 (SSINSTRUMNT)
@@ -185,120 +415,64 @@ async def get_tasa_cambio_sap():
     - Pos 228-237: RZUSATZ (espacios)
     - Pos 238: NEWLINE
     """
+    global _sap_cache
+
+    ts, body, headers = _sap_cache
+    if time.monotonic() - ts < _SAP_CACHE_TTL:
+        return _sap_response(request, body, headers)
+
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            # Buscar todas las filas de la tabla
-            cursor.execute(
-                "SELECT SSINSTRUMNT, MIFEEDNAME, RATETYPE, TIMESTAMP_VALOR, CURRENCY FROM dbo.MonedaValor ORDER BY TIMESTAMP_VALOR DESC"
-            )
-            rows = cursor.fetchall()
+        async with _sap_lock:
+            # Revalidar dentro del lock: otro request pudo refrescar el cache
+            # mientras esperábamos.
+            ts, body, headers = _sap_cache
+            if time.monotonic() - ts < _SAP_CACHE_TTL:
+                return _sap_response(request, body, headers)
 
-            if not rows:
+            row = await run_in_threadpool(_fetch_tasa_sap)
+
+            if row is None:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="No se encontraron datos en la tabla MonedaValor.",
                 )
 
-            lineas_formateadas = []
-
-            for row in rows:
-                ssinstrumnt = row.SSINSTRUMNT.strip()
-                mifeedname = row.MIFEEDNAME.strip()
-                ratetype = row.RATETYPE.strip()
-                currency = row.CURRENCY.strip()
-                
-                # Parsear TIMESTAMP_VALOR: formato es YYYYMMDDHHMMSS+valor
-                # Ejemplo: 20260223140000+4235.500000
-                timestamp_valor = row.TIMESTAMP_VALOR
-                
-                # Extraer fecha (primeros 8 caracteres)
-                # Extraer hora (siguientes 6 caracteres)
-                # El resto es el valor (con signo)
-                if len(timestamp_valor) < 14:
-                    # Si una fila tiene un formato inválido, podemos saltarla o lanzar error.
-                    # Por ahora lanzamos error para mantener la integridad.
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail=f"Formato TIMESTAMP_VALOR inválido para {ssinstrumnt}: {timestamp_valor}",
-                    )
-                
-                fecha_str = timestamp_valor[0:8]  # YYYYMMDD
-                hora_str = timestamp_valor[8:14]  # HHMMSS
-                valor_str_raw = timestamp_valor[14:]  # +4235.500000
-
-                # Construir la línea con formato fixed-width (238 caracteres)
-                # Pos 1-20: RINID1 (SSINSTRUMNT)
-                rinid1 = ssinstrumnt.ljust(20)
-                
-                # Pos 21-35: RINID2 (MIFEEDNAME)
-                rinid2 = mifeedname.ljust(15)
-                
-                # Pos 36-50: SPRPTY (RATETYPE)
-                sprpty = ratetype.ljust(15)
-                
-                # Pos 51-52: SSTATS (OK)
-                sstats = "  "  # 2 espacios
-                
-                # Pos 53-132: ERROR (80 espacios)
-                error = " " * 80
-                
-                # Pos 133-142: RSUPID (10 espacios)
-                rsupid = " " * 10
-                
-                # Pos 143-152: RCONID (10 espacios)
-                rconid = " " * 10
-                
-                # Pos 153-157: RCONCN (5 espacios)
-                rconcn = " " * 5
-                
-                # Pos 158-165: DATE
-                date_val = fecha_str  # 8 caracteres
-                
-                # Pos 166-171: TIME
-                time_val = hora_str   # 6 caracteres
-                
-                # Pos 172-191: VALUE (20 caracteres, alineado a derecha)
-                valor_str = valor_str_raw.rjust(20)
-                
-                # Pos 192-196: CURRENCY
-                currency_val = currency.ljust(5)
-                
-                # Pos 197-201: MKIND (5 espacios)
-                mkind = " " * 5
-                
-                # Pos 202-208: CFFACT (7 espacios)
-                cffact = " " * 7
-                
-                # Pos 209-215: CTFACT (7 espacios)
-                ctfact = " " * 7
-                
-                # Pos 216-227: UNAME (12 espacios)
-                uname = " " * 12
-                
-                # Pos 228-237: RZUSATZ (10 espacios)
-                rzusatz = " " * 10
-                
-                # Ensamblar la línea completa (237 caracteres)
-                linea = (rinid1 + rinid2 + sprpty + sstats + error + rsupid + 
-                        rconid + rconcn + date_val + time_val + valor_str + currency_val + 
-                        mkind + cffact + ctfact + uname + rzusatz)
-                
-                # Verificar que tiene exactamente 237 caracteres
-                if len(linea) != 237:
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail=f"Error en formato para {ssinstrumnt}: se generaron {len(linea)} caracteres en lugar de 237.",
-                    )
-                
-                lineas_formateadas.append(linea)
-            
-            # Unir todas las líneas con saltos de línea (newline para SAP TBD4)
-            # SAP suele requerir un salto de línea al final de cada registro si son múltiples.
-            content = "\n".join(lineas_formateadas)
-            
-            # Retornar texto plano
-            return PlainTextResponse(content=content)
+            # Desempaquetado posicional (evita el __getattr__ de pyodbc.Row).
+            # TIMESTAMP_VALOR tiene formato YYYYMMDDHHMMSS+valor,
+            # ej: 20260223140000+4235.500000
+            ssinstrumnt, mifeedname, ratetype, timestamp_valor, currency = row
+
+            if len(timestamp_valor) < 14:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Formato TIMESTAMP_VALOR inválido para {ssinstrumnt}: {timestamp_valor}",
+                )
+
+            # Construir la línea fixed-width de 237 caracteres a partir de la
+            # plantilla. Los cortes de TIMESTAMP_VALOR van inline para no crear
+            # strings intermedios: fecha=[0:8] (YYYYMMDD), hora=[8:14] (HHMMSS),
+            # valor=[14:] (p. ej. +4235.500000).
+            linea = _SAP_LINEA_TMPL.format(
+                rinid1=ssinstrumnt.ljust(20),
+                rinid2=mifeedname.ljust(15),
+                sprpty=ratetype.ljust(15),
+                fecha=timestamp_valor[:8],
+                hora=timestamp_valor[8:14],
+                valor=timestamp_valor[14:].rjust(20),
+                currency=currency.ljust(5),
+            )
+
+            # La plantilla garantiza los 237 caracteres mientras los campos
+            # respeten sus anchos; el assert desaparece al correr con -O.
+            assert len(linea) == 237, f"Línea de {len(linea)} caracteres para {ssinstrumnt}"
+
+            body = linea.encode("ascii")
+            etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+            headers = {"Content-Length": "237", "ETag": etag}
+            _sap_cache = (time.monotonic(), body, headers)
+
+            # Retornar texto plano pre-codificado
+            return _sap_response(request, body, headers)
 
     except HTTPException:
         raise
@@ -331,28 +505,16 @@ async def get_moneda_valor(
     - Retorna 404 si el instrumento no existe.
     """
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT SSINSTRUMNT, MIFEEDNAME, RATETYPE, TIMESTAMP_VALOR, CURRENCY FROM dbo.MonedaValor WHERE SSINSTRUMNT = ?",
-                (instrumento.strip(),),
-            )
-            row = cursor.fetchone()
-
-            if row is None:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Instrumento {instrumento} no encontrado.",
-                )
+        moneda = await run_in_threadpool(_fetch_instrumento, instrumento)
 
-            return MonedaValor(
-                ssinstrumnt=row.SSINSTRUMNT.strip(),
-                mifeedname=row.MIFEEDNAME.strip(),
-                ratetype=row.RATETYPE.strip(),
-                timestamp_valor=row.TIMESTAMP_VALOR,
-                currency=row.CURRENCY.strip(),
+        if moneda is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Instrumento {instrumento} no encontrado.",
             )
 
+        return moneda
+
     except HTTPException:
         raise
     except Exception as e:
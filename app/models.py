@@ -3,7 +3,6 @@ Modelos Pydantic para la serialización de respuestas de la API.
 """
 
 from pydantic import BaseModel
-from decimal import Decimal
 
 
 class MonedaValor(BaseModel):
@@ -41,15 +40,3 @@ class HealthResponse(BaseModel):
 class ErrorResponse(BaseModel):
     """Respuesta de error."""
     detail: str
-
-
-class TasaCambioSAP(BaseModel):
-    """Formato fixed-width para TBD4/RINID de SAP (238 caracteres exactos)."""
-    linea: str
-
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "linea": "USDCOPTRM           MIF            MID                20260223140000+        4235.50000COP                                          "
-            }
-        }
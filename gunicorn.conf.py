@@ -0,0 +1,23 @@
+"""
+Configuración de Gunicorn para la MonedaValor API.
+
+El pool de conexiones a Azure SQL es por proceso (_MAX_POOL_SIZE = 5), así
+que un solo worker tope el throughput en ~5 queries concurrentes. Varios
+workers uvicorn multiplican la capacidad y cada proceso mantiene su propio
+pool caliente.
+
+Uso: gunicorn app.main:app -c gunicorn.conf.py
+"""
+
+import multiprocessing
+
+bind = "0.0.0.0:8000"
+workers = 2 * multiprocessing.cpu_count() + 1
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = 120
+
+# IMPORTANTE: sin preload. Los handles de pyodbc no sobreviven un fork; cada
+# worker debe importar la app y abrir su pool después del fork. El lifespan
+# loguea pool_size y PID para poder auditar el total de sesiones contra
+# Azure SQL (workers × _MAX_POOL_SIZE).
+preload_app = False